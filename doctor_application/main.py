@@ -9,10 +9,26 @@ import requests
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import io
 import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
 import time
+import uuid
+import weakref
+import zipfile
+
+from prescription_renderer import render_batch
 
 # Configure Streamlit page
 st.set_page_config(
@@ -24,21 +40,674 @@ st.set_page_config(
 
 # Configuration
 API_BASE_URL = "http://localhost:3000/api"  # Your backend URL
+DATA_CACHE_TTL_SECONDS = 30  # How long fetched lists are reused across reruns
+SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_MB", "16")) * 1024 * 1024
+SHARED_MEMORY_BUDGET_BYTES = int(os.getenv("SHARED_MEMORY_BUDGET_MB", "128")) * 1024 * 1024
+SHARED_DATASET_MIN_RECORDS = 50  # Responses this large are kept once per process
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot.sqlite3"))
+SNAPSHOT_MAX_ENTRIES = 200
+SNAPSHOT_PRUNE_EVERY = 50  # Writes between trims of the snapshot table
+RENDER_WORKERS = os.cpu_count() or 1
+MEDICINE_PAGE_SIZE = 20  # Catalogue items loaded per "Load more"
+BATCH_PRINT_PAGE_SIZE = 500  # Completed appointments fetched per request for a print batch
+PREFETCH_MAX_PAGES = 2  # Likely next pages warmed after each rerun
+PREFETCH_IDLE_DELAY = 0.5  # Seconds to wait after a rerun before prefetching
+PREFETCH_BUDGET_SECONDS = 3.0  # No new prefetch requests are started after this
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+PROFILE_SAMPLE_INTERVAL = 0.002  # Seconds between stack samples while profiling
+PROFILE_MAX_FILES = 50  # Oldest profiles are deleted beyond this
+
+class CompactRecord:
+    """Slotted, read-only view of a backend document with dict-style access"""
+    
+    __slots__ = ()
+    _INTERNED: Tuple[str, ...] = ()
+    
+    @classmethod
+    def from_json(cls, data: Dict) -> "CompactRecord":
+        """Build a record from a JSON document, interning repeated strings"""
+        record = object.__new__(cls)
+        for field in cls.__slots__:
+            value = data.get(field)
+            if field in cls._INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(record, field, value)
+        return record
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+    
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+class AppointmentRecord(CompactRecord):
+    """Compact appointment as returned by /appointments"""
+    
+    __slots__ = ("_id", "userId", "doctorName", "specialty", "appointmentDate", "timeSlot",
+                 "type", "symptoms", "status", "notes", "fees", "prescription", "createdAt")
+    _INTERNED = ("userId", "doctorName", "specialty", "timeSlot", "type", "status")
+    
+    @classmethod
+    def from_json(cls, data: Dict) -> "AppointmentRecord":
+        record = super().from_json(data)
+        if record.symptoms:
+            object.__setattr__(record, "symptoms", tuple(
+                sys.intern(s) if isinstance(s, str) else s for s in record.symptoms
+            ))
+        return record
+
+class MedicineRecord(CompactRecord):
+    """Compact medicine as returned by /medicines"""
+    
+    __slots__ = ("_id", "name", "genericName", "manufacturer", "category", "description", "price",
+                 "originalPrice", "discount", "dosage", "packaging", "prescriptionRequired", "stock", "rating")
+    _INTERNED = ("manufacturer", "category", "dosage", "packaging")
+
+def decode_appointments(data: Dict) -> Dict:
+    return {**data, "appointments": tuple(AppointmentRecord.from_json(a) for a in data.get("appointments", []))}
+
+def decode_medicines(data: Dict) -> Dict:
+    return {**data, "medicines": tuple(MedicineRecord.from_json(m) for m in data.get("medicines", []))}
+
+def decode_categories(data: List[str]) -> Tuple[str, ...]:
+    return tuple(sys.intern(c) for c in data)
+
+def estimate_size(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate deep size of cached data in bytes, counting shared objects once"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(estimate_size(getattr(obj, field, None), seen) for field in obj.__slots__)
+    return size
+
+class BoundedCache:
+    """LRU cache of API payloads with a TTL, evicting to stay under a byte budget"""
+    
+    def __init__(self, budget_bytes: int, ttl_seconds: float = DATA_CACHE_TTL_SECONDS):
+        self.budget_bytes = budget_bytes
+        self.ttl_seconds = ttl_seconds
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple):
+        """Return a fresh cached value or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+    
+    def put(self, key: Tuple, value: Any) -> bool:
+        """Store a value, evicting least recently used entries to fit the budget"""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.budget_bytes:
+                return False
+            while self._entries and self.used_bytes + size > self.budget_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (time.monotonic(), size, value)
+            self.used_bytes += size
+            return True
+    
+    def discard(self, key: Tuple):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+    
+    def invalidate(self, kind: Optional[str] = None):
+        """Drop every entry, or only those whose key starts with `kind`"""
+        with self._lock:
+            for key in [k for k in self._entries if kind is None or k[0] == kind]:
+                self._drop(key)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "used_mb": round(self.used_bytes / (1024 * 1024), 3),
+                "budget_mb": round(self.budget_bytes / (1024 * 1024), 3),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+    
+    def _drop(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self.used_bytes -= size
+
+@st.cache_resource
+def get_shared_cache() -> BoundedCache:
+    """Process-wide cache for large read-only datasets, shared by all sessions"""
+    return BoundedCache(SHARED_MEMORY_BUDGET_BYTES)
+
+@st.cache_resource
+def get_session_registry() -> "weakref.WeakValueDictionary[str, BoundedCache]":
+    """Per-session caches by session id, used for the memory report"""
+    return weakref.WeakValueDictionary()
+
+class Snapshot(NamedTuple):
+    data: Any
+    saved_at: float
+    dirty: bool
+
+class SnapshotStore:
+    """Last good backend responses persisted in SQLite.
+    
+    Snapshots are served immediately on a cold start, before this process has
+    fetched a key itself, and whenever the backend is unreachable. Entries are
+    marked dirty after a write so they are only used as an outage fallback
+    until they have been fetched again. If the file cannot be opened the
+    store is disabled and every read misses.
+    """
+    
+    def __init__(self, path: str = SNAPSHOT_PATH, max_entries: int = SNAPSHOT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._live: set = set()  # Keys fetched from the backend by this process
+        self._saved: Dict[str, int] = {}  # Key -> hash of the payload last written
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "saved_at REAL NOT NULL, dirty INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error:
+            pass  # Run without a snapshot; a missing one only costs cold fetches
+    
+    def load(self, key: Tuple) -> Optional[Snapshot]:
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT payload, saved_at, dirty FROM snapshot WHERE key = ?", (json.dumps(key),)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return Snapshot(json.loads(row[0]), row[1], bool(row[2]))
+    
+    def save(self, key: Tuple, data: Any):
+        """Persist a fresh response, skipping the write if it is unchanged"""
+        key_json, payload = json.dumps(key), json.dumps(data)
+        with self._lock:
+            self._live.add(key)
+            if self._conn is None or self._saved.get(key_json) == hash(payload):
+                return
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO snapshot (key, kind, payload, saved_at, dirty) VALUES (?, ?, ?, ?, 0)",
+                    (key_json, key[0], payload, time.time())
+                )
+                self._saved[key_json] = hash(payload)
+                self._writes += 1
+                if self._writes % SNAPSHOT_PRUNE_EVERY == 0:
+                    self._conn.execute(
+                        "DELETE FROM snapshot WHERE key NOT IN "
+                        "(SELECT key FROM snapshot ORDER BY saved_at DESC LIMIT ?)",
+                        (self.max_entries,)
+                    )
+        except sqlite3.Error:
+            pass  # A missing snapshot only costs a cold fetch
+    
+    def is_live(self, key: Tuple) -> bool:
+        """Whether this process has already fetched `key` from the backend"""
+        with self._lock:
+            return key in self._live
+    
+    def mark_dirty(self, kind: Optional[str] = None):
+        if self._conn is None:
+            return
+        try:
+            with self._lock, self._conn:
+                if kind is None:
+                    self._conn.execute("UPDATE snapshot SET dirty = 1")
+                    self._saved.clear()
+                else:
+                    self._conn.execute("UPDATE snapshot SET dirty = 1 WHERE kind = ?", (kind,))
+                    self._saved = {k: v for k, v in self._saved.items() if json.loads(k)[0] != kind}
+        except sqlite3.Error:
+            pass  # Dirty entries only matter for the next cold start
+    
+    def has_data(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT 1 FROM snapshot WHERE kind != 'health' LIMIT 1"
+                ).fetchone() is not None
+        except sqlite3.Error:
+            return False
+    
+    def begin_refresh(self, key: Tuple) -> bool:
+        """Claim a background refresh of `key`; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+    
+    def end_refresh(self, key: Tuple):
+        with self._lock:
+            self._refreshing.discard(key)
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    """Process-wide snapshot file shared by all sessions"""
+    return SnapshotStore()
+
+@st.cache_resource
+def get_render_pool() -> ProcessPoolExecutor:
+    """Worker processes for rendering prescriptions, shared by all sessions"""
+    return ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def reset_render_pool(pool: ProcessPoolExecutor):
+    """Replace `pool` after a worker died, unless it was already replaced"""
+    if get_render_pool() is pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+        get_render_pool.clear()
+
+class PrescriptionBatchJob:
+    """Prescriptions rendered in chunks on the process pool and zipped when done"""
+    
+    def __init__(self, appointments: List[Dict], pool: ProcessPoolExecutor, file_name: str):
+        self.file_name = file_name
+        self.pool = pool
+        self.total = len(appointments)
+        # A few chunks per worker keeps cores busy and progress updates smooth
+        chunk_size = max(1, math.ceil(self.total / (RENDER_WORKERS * 4)))
+        self._chunks: List[Tuple[Future, int]] = [
+            (pool.submit(render_batch, appointments[i:i + chunk_size]), len(appointments[i:i + chunk_size]))
+            for i in range(0, self.total, chunk_size)
+        ]
+        self._zip: Optional[bytes] = None
+    
+    @property
+    def rendered(self) -> int:
+        return sum(size for future, size in self._chunks if future.done())
+    
+    @property
+    def done(self) -> bool:
+        return all(future.done() for future, _ in self._chunks)
+    
+    @property
+    def error(self) -> Optional[BaseException]:
+        for future, _ in self._chunks:
+            if future.done() and future.exception() is not None:
+                return future.exception()
+        return None
+    
+    def zip_bytes(self) -> bytes:
+        """Zip archive of all rendered prescriptions, built once"""
+        if self._zip is None:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for future, _ in self._chunks:
+                    for file_name, page in future.result():
+                        archive.writestr(file_name, page)
+            self._zip = buffer.getvalue()
+        return self._zip
+    
+    def cancel(self):
+        for future, _ in self._chunks:
+            future.cancel()
+
+class NavigationStats:
+    """Per-doctor page transition counts, used to predict the next page"""
+    
+    def __init__(self):
+        self._transitions: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+    
+    def record(self, doctor_id: str, from_page: str, to_page: str):
+        with self._lock:
+            self._transitions[(doctor_id, from_page)][to_page] += 1
+    
+    def likely_next(self, doctor_id: str, page: str, candidates: List[str], limit: int = PREFETCH_MAX_PAGES) -> List[str]:
+        """Most visited pages after `page`, falling back to the navigation order"""
+        with self._lock:
+            counts = dict(self._transitions.get((doctor_id, page), {}))
+        others = [c for c in candidates if c != page]
+        return sorted(others, key=lambda c: -counts.get(c, 0))[:limit]
+
+@st.cache_resource
+def get_navigation_stats() -> NavigationStats:
+    """Navigation history of every doctor, shared across sessions"""
+    return NavigationStats()
+
+class Prefetcher:
+    """Warms the cache for a session's likely next pages once a rerun is idle.
+    
+    Each page's loaders run in order on a background thread. A new rerun
+    cancels the thread before it starts any further request, and nothing new
+    is started once PREFETCH_BUDGET_SECONDS have passed. A request already in
+    flight cannot be aborted; a rerun that needs the same data waits for it
+    instead of fetching it again.
+    """
+    
+    def __init__(self, client: "APIClient"):
+        self.client = client
+        self._cancel = threading.Event()
+    
+    def start(self, pages: List[str]):
+        self.cancel()
+        self._cancel = threading.Event()
+        threading.Thread(target=self._run, args=(pages, self._cancel), daemon=True).start()
+    
+    def cancel(self):
+        self._cancel.set()
+    
+    def _run(self, pages: List[str], cancel: threading.Event):
+        if cancel.wait(PREFETCH_IDLE_DELAY):
+            return
+        deadline = time.monotonic() + PREFETCH_BUDGET_SECONDS
+        with self.client.background():
+            for page in pages:
+                for load in PAGE_PREFETCHES.get(page, []):
+                    if cancel.is_set() or time.monotonic() > deadline:
+                        return
+                    load(self.client)
+
+class RerunProfiler:
+    """Sampling profiler for a single rerun, exported as a speedscope flamegraph.
+    
+    A background thread samples the script thread's stack every
+    PROFILE_SAMPLE_INTERVAL seconds. Only frames from this script downwards are
+    kept, and each sample is attributed to network, rendering or data shaping
+    by the modules on its stack.
+    """
+    
+    NETWORK_MODULES = ("requests", "urllib3", "http", "socket", "ssl")
+    RENDERING_MODULES = ("streamlit", "plotly")
+    
+    def __init__(self, name: str, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.frames: List[Dict] = []
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self.breakdown = {"network": 0.0, "rendering": 0.0, "data shaping": 0.0}
+        self.elapsed = 0.0
+        self._frame_index: Dict[Tuple, int] = {}
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+    
+    def __enter__(self) -> "RerunProfiler":
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+        self.elapsed = time.perf_counter() - self._started
+        return False
+    
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self._record(frame, now - last)
+            last = now
+    
+    def _record(self, frame, weight: float):
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        stack.reverse()
+        # Drop Streamlit's script runner frames above this script
+        for start, f in enumerate(stack):
+            if f.f_code.co_filename == __file__:
+                break
+        else:
+            return
+        stack = stack[start:]
+        
+        modules = {f.f_globals.get("__name__", "").split(".")[0] for f in stack}
+        if modules.intersection(self.NETWORK_MODULES):
+            category = "network"
+        elif modules.intersection(self.RENDERING_MODULES):
+            category = "rendering"
+        else:
+            category = "data shaping"
+        self.breakdown[category] += weight
+        
+        sample = []
+        for f in stack:
+            key = (f.f_code.co_name, f.f_code.co_filename, f.f_code.co_firstlineno)
+            if key not in self._frame_index:
+                self._frame_index[key] = len(self.frames)
+                self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            sample.append(self._frame_index[key])
+        self.samples.append(sample)
+        self.weights.append(weight)
+    
+    def save(self, output_dir: str = PROFILE_OUTPUT_DIR) -> str:
+        """Write the profile as a speedscope file and return its path"""
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(output_dir, f"{stamp}_{self.name}.speedscope.json")
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "mediculture-doctor-app",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.elapsed,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "breakdown": self.breakdown,
+        }
+        with open(path, "w") as f:
+            json.dump(document, f)
+        
+        # File names start with a timestamp, so sorting puts the oldest first
+        profiles = sorted(n for n in os.listdir(output_dir) if n.endswith(".speedscope.json"))
+        for name in profiles[:-PROFILE_MAX_FILES]:
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError:
+                pass
+        return path
+
+def is_admin() -> bool:
+    """Whether the logged-in doctor is listed in ADMIN_EMAILS"""
+    doctor = st.session_state.get("doctor_data") or {}
+    return doctor.get("email", "").lower() in ADMIN_EMAILS
+
+def profiling_requested() -> bool:
+    """Profile this rerun for admins who set ?profile=1 or turned on the sidebar toggle"""
+    if not is_admin():
+        return False
+    return st.query_params.get("profile") == "1" or st.session_state.get("profiling_enabled", False)
 
 class APIClient:
     """Client to interact with your Mediculture backend"""
     
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, cache: Optional[BoundedCache] = None,
+                 shared_cache: Optional[BoundedCache] = None,
+                 snapshot: Optional[SnapshotStore] = None):
         self.base_url = base_url
+        self.cache = cache or BoundedCache(SESSION_MEMORY_BUDGET_BYTES)
+        self.shared_cache = shared_cache or get_shared_cache()
+        self.snapshot = snapshot or get_snapshot_store()
+        self.stale_since: Dict[str, float] = {}  # Data kind -> snapshot time, for this rerun
+        self._background = threading.local()  # Set on prefetch threads
+        self._inflight: Dict[Tuple, threading.Event] = {}  # Keys being fetched in the background
+    
+    @property
+    def in_background(self) -> bool:
+        return getattr(self._background, "active", False)
+    
+    @contextmanager
+    def background(self):
+        """Mark calls on this thread as background work: errors and stale
+        markers stay off the page, and fetches can be joined by the page"""
+        self._background.active = True
+        try:
+            yield
+        finally:
+            self._background.active = False
+    
+    def _report_error(self, message: str):
+        """Show an error on the page; background prefetches fail silently"""
+        if not self.in_background:
+            st.error(message)
+    
+    def _cached(self, key: Tuple, fetch: Callable[[], Any], decode: Callable[[Any], Any],
+                size_of: Callable[[Any], int] = len) -> Any:
+        """Serve `key` from memory, the disk snapshot or the backend.
+        
+        On a cold start, before this process has fetched `key`, a clean snapshot
+        is returned at once (marked stale) while a background thread revalidates
+        it. Otherwise the backend is queried, falling back to the snapshot if it
+        is unreachable.
+        """
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        
+        # Join a prefetch of the same key instead of issuing a duplicate request
+        inflight = self._inflight.get(key)
+        if inflight is not None and not self.in_background:
+            inflight.wait(timeout=10)
+            value = self._lookup(key)
+            if value is not None:
+                return value
+        
+        snapshot = self.snapshot.load(key)
+        if snapshot is not None and not snapshot.dirty and not self.snapshot.is_live(key):
+            self._revalidate(key, fetch, decode, size_of)
+            return self._serve_stale(key, snapshot, decode)
+        done = threading.Event()
+        if self.in_background:
+            self._inflight[key] = done
+        try:
+            return self._store(key, fetch(), decode, size_of)
+        except Exception:
+            if snapshot is None:
+                raise
+            return self._serve_stale(key, snapshot, decode)
+        finally:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            done.set()
+    
+    def _lookup(self, key: Tuple) -> Any:
+        value = self.cache.get(key)
+        if value is None:
+            value = self.shared_cache.get(key)
+        return value
+    
+    def _store(self, key: Tuple, data: Any, decode: Callable[[Any], Any], size_of: Callable[[Any], int]) -> Any:
+        """Persist a fresh response and cache its decoded form.
+        
+        Results with at least SHARED_DATASET_MIN_RECORDS records go to the shared
+        cache so concurrent sessions hold one copy; smaller ones count against
+        this session's budget.
+        """
+        self.snapshot.save(key, data)
+        value = decode(data)
+        if size_of(value) >= SHARED_DATASET_MIN_RECORDS:
+            self.shared_cache.put(key, value)
+        else:
+            self.cache.put(key, value)
+        return value
+    
+    def _serve_stale(self, key: Tuple, snapshot: Snapshot, decode: Callable[[Any], Any]) -> Any:
+        if not self.in_background:
+            self.stale_since[key[0]] = min(snapshot.saved_at, self.stale_since.get(key[0], snapshot.saved_at))
+        return decode(snapshot.data)
+    
+    def _revalidate(self, key: Tuple, fetch: Callable[[], Any], decode: Callable[[Any], Any],
+                    size_of: Callable[[Any], int]):
+        """Refresh `key` in a background thread unless a refresh is already running"""
+        if not self.snapshot.begin_refresh(key):
+            return
+        
+        def refresh():
+            try:
+                self._store(key, fetch(), decode, size_of)
+            except Exception:
+                pass  # Keep serving the snapshot until the backend is back
+            finally:
+                self.snapshot.end_refresh(key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def invalidate(self, kind: Optional[str] = None):
+        """Forget cached data in every session so the next read goes to the backend"""
+        self.cache.invalidate(kind)
+        for cache in list(get_session_registry().values()):
+            cache.invalidate(kind)
+        self.shared_cache.invalidate(kind)
+        self.snapshot.mark_dirty(kind)
     
     def get_health_status(self) -> Dict:
         """Check backend health"""
         try:
             response = requests.get(f"{self.base_url}/health", timeout=5)
             response.raise_for_status()
-            return response.json()
+            health = response.json()
+            # The timestamp changes on every call; only new counts need a write
+            self.snapshot.save(("health",), {k: v for k, v in health.items() if k != "timestamp"})
+            return health
         except Exception as e:
-            return {"status": "Error", "error": str(e)}
+            health = {"status": "Error", "error": str(e)}
+            snapshot = self.snapshot.load(("health",))
+            if snapshot is not None:
+                # Keep the last known collection counts for the dashboard
+                health["collections"] = snapshot.data.get("collections", {})
+                self.stale_since["health"] = snapshot.saved_at
+            return health
     
     def get_appointments(self, firebase_uid: str = "", status: str = "", limit: int = 50) -> Dict:
         """Get appointments from backend"""
@@ -49,13 +718,53 @@ class APIClient:
             if status:
                 params["status"] = status
             
-            response = requests.get(f"{self.base_url}/appointments", params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            def fetch():
+                response = requests.get(f"{self.base_url}/appointments", params=params, timeout=10)
+                response.raise_for_status()
+                return response.json()
+            
+            key = ("appointments", firebase_uid or "", status or "", limit)
+            return dict(self._cached(key, fetch, decode_appointments, lambda d: len(d["appointments"])))
         except Exception as e:
-            st.error(f"Error fetching appointments: {e}")
+            self._report_error(f"Error fetching appointments: {e}")
             return {"appointments": []}
     
+    def get_completed_appointments_between(self, doctor_name: str, start: str, end: str,
+                                           page_size: int = BATCH_PRINT_PAGE_SIZE) -> Optional[List[Dict]]:
+        """Get every completed appointment of a doctor in an appointmentDate range.
+        
+        Bypasses the caches and snapshot. Results come newest first, so pages
+        are walked backwards by moving `to` to the oldest date seen.
+        """
+        try:
+            appointments: Dict[str, Dict] = {}
+            upper = end
+            limit = page_size
+            while True:
+                response = requests.get(
+                    f"{self.base_url}/appointments",
+                    params={"doctorName": doctor_name, "status": "completed",
+                            "from": start, "to": upper, "limit": limit},
+                    timeout=10
+                )
+                response.raise_for_status()
+                page = response.json().get("appointments", [])
+                new = [a for a in page if a.get('_id') not in appointments]
+                appointments.update((a.get('_id'), a) for a in new)
+                if len(page) < limit:
+                    return list(appointments.values())
+                if page[0].get('appointmentDate') == page[-1].get('appointmentDate'):
+                    # One date fills the page; widen it so the walk can get past that date
+                    limit *= 2
+                    continue
+                if not new:
+                    return list(appointments.values())
+                upper = page[-1]['appointmentDate']
+                limit = page_size
+        except Exception as e:
+            self._report_error(f"Error fetching appointments: {e}")
+            return None
+    
     def update_appointment_status(self, appointment_id: str, status: str) -> bool:
         """Update appointment status"""
         try:
@@ -65,6 +774,7 @@ class APIClient:
                 timeout=10
             )
             response.raise_for_status()
+            self.invalidate("appointments")
             return True
         except Exception as e:
             st.error(f"Error updating appointment: {e}")
@@ -79,36 +789,54 @@ class APIClient:
                 timeout=10
             )
             response.raise_for_status()
+            self.invalidate("appointments")
             return response.json()
         except Exception as e:
             st.error(f"Error creating appointment: {e}")
             return {}
     
     def get_medicines(self, page: int = 1, limit: int = 20, search: str = "", 
-                     category: str = "") -> Dict:
-        """Get medicines from backend"""
+                     category: str = "", cursor: Optional[str] = None,
+                     include_total: bool = True) -> Dict:
+        """Get medicines from backend.
+        
+        Pass `cursor` ("" for the first page, then the previous page's
+        `nextCursor`) for keyset pagination instead of `page`.
+        """
         try:
-            params = {"page": page, "limit": limit}
+            if cursor is None:
+                params = {"page": page, "limit": limit}
+            else:
+                params = {"cursor": cursor, "limit": limit}
+            if not include_total:
+                params["includeTotal"] = "false"
             if search:
                 params["search"] = search
             if category:
                 params["category"] = category
             
-            response = requests.get(f"{self.base_url}/medicines", params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            def fetch():
+                response = requests.get(f"{self.base_url}/medicines", params=params, timeout=10)
+                response.raise_for_status()
+                return response.json()
+            
+            key = ("medicines", page if cursor is None else cursor, limit, search or "", category or "", include_total)
+            return dict(self._cached(key, fetch, decode_medicines, lambda d: len(d["medicines"])))
         except Exception as e:
-            st.error(f"Error fetching medicines: {e}")
+            self._report_error(f"Error fetching medicines: {e}")
             return {"medicines": [], "pagination": {}}
     
     def get_medicine_categories(self) -> List[str]:
         """Get available medicine categories"""
         try:
-            response = requests.get(f"{self.base_url}/medicines/categories/list", timeout=10)
-            response.raise_for_status()
-            return response.json()
+            def fetch():
+                response = requests.get(f"{self.base_url}/medicines/categories/list", timeout=10)
+                response.raise_for_status()
+                return response.json()
+            
+            return list(self._cached(("categories",), fetch, decode_categories))
         except Exception as e:
-            st.error(f"Error fetching categories: {e}")
+            self._report_error(f"Error fetching categories: {e}")
             return []
     
     def get_user_profile(self, firebase_uid: str) -> Dict:
@@ -132,11 +860,19 @@ def init_session_state():
         st.session_state.doctor_data = None
     if 'api_client' not in st.session_state:
         st.session_state.api_client = APIClient(API_BASE_URL)
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex[:8]
+    if 'prefetcher' not in st.session_state:
+        st.session_state.prefetcher = Prefetcher(st.session_state.api_client)
+    get_session_registry()[st.session_state.session_id] = st.session_state.api_client.cache
 
 def check_backend_connection():
     """Check if backend is accessible"""
     health_status = st.session_state.api_client.get_health_status()
     if health_status.get("status") != "OK":
+        if st.session_state.api_client.snapshot.has_data():
+            st.warning("⚠️ Cannot connect to backend server. Showing the last saved data until it is back.")
+            return health_status
         st.error("⚠️ Cannot connect to backend server. Please ensure your Node.js server is running at http://localhost:3000")
         st.stop()
     return health_status
@@ -154,7 +890,8 @@ def show_login():
     with st.spinner("Checking backend connection..."):
         health_status = check_backend_connection()
     
-    st.success(f"✅ Backend connected - Database: {health_status.get('database', 'Unknown')}")
+    if health_status.get("status") == "OK":
+        st.success(f"✅ Backend connected - Database: {health_status.get('database', 'Unknown')}")
     
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -233,6 +970,10 @@ def show_sidebar():
         else:
             st.error("Backend: Disconnected")
         
+        # Memory usage of cached data
+        with st.expander("🧠 Memory Usage"):
+            show_memory_report()
+        
         st.divider()
         
         # Quick actions
@@ -244,6 +985,10 @@ def show_sidebar():
         if st.button("⚙️ Settings", use_container_width=True):
             st.info("Settings panel (Coming Soon)")
         
+        if is_admin():
+            st.toggle("⏱️ Profile page loads", key="profiling_enabled",
+                      help=f"Save a speedscope flamegraph of every rerun to {PROFILE_OUTPUT_DIR}/")
+        
         st.divider()
         
         # Logout
@@ -252,6 +997,18 @@ def show_sidebar():
             st.session_state.doctor_data = None
             st.rerun()
 
+def show_memory_report():
+    """Show cached data size for every active session and the shared store"""
+    rows = [
+        {"session": session_id, **cache.stats()}
+        for session_id, cache in list(get_session_registry().items())
+    ]
+    rows.append({"session": "shared", **get_shared_cache().stats()})
+    
+    current = st.session_state.api_client.cache.stats()
+    st.caption(f"This session: {current['used_mb']} / {current['budget_mb']} MB")
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
 def show_appointments():
     """Show appointments management page"""
     st.markdown("# 📅 Appointment Management")
@@ -268,6 +1025,7 @@ def show_appointments():
         )
     with col3:
         if st.button("🔄 Refresh", use_container_width=True):
+            st.session_state.api_client.invalidate("appointments")
             st.rerun()
     
     st.divider()
@@ -399,30 +1157,33 @@ def show_medicines():
     
     st.divider()
     
-    # Fetch medicines from backend
-    if search_button or search_query or category_filter != "All":
-        with st.spinner("Searching medicines..."):
-            medicines_data = st.session_state.api_client.get_medicines(
-                page=1,
-                limit=50,
-                search=search_query if search_query else None,
-                category=category_filter if category_filter != "All" else None
-            )
-    else:
+    # The loaded catalogue lives in the session cache, so it expires, is cleared by
+    # invalidate("medicines") and counts against the session's memory budget
+    search = search_query if search_query else None
+    category = category_filter if category_filter != "All" else None
+    key = ("medicines", "catalogue", search or "", category or "")
+    cache = st.session_state.api_client.cache
+    if search_button:
+        cache.discard(key)
+    
+    catalogue = cache.get(key)
+    if catalogue is not None and time.monotonic() - catalogue["loaded_at"] > DATA_CACHE_TTL_SECONDS:
+        catalogue = None  # Start over rather than mix old and new pages
+    if catalogue is None:
         with st.spinner("Loading medicines..."):
-            medicines_data = st.session_state.api_client.get_medicines(page=1, limit=20)
+            catalogue = load_catalogue_page(key, search, category, restart=True)
     
-    medicines = medicines_data.get("medicines", [])
-    pagination = medicines_data.get("pagination", {})
+    medicines = catalogue["medicines"] if catalogue else ()
+    total_items = catalogue["total"] if catalogue else None
     
     if not medicines:
         st.info("📭 No medicines found matching your criteria")
         return
     
     # Display results summary
-    st.markdown(f"### Found {len(medicines)} medicines")
-    if pagination.get("totalItems"):
-        st.markdown(f"Showing {len(medicines)} of {pagination['totalItems']} total medicines")
+    st.markdown(f"### Found {total_items if total_items else len(medicines)} medicines")
+    if total_items:
+        st.markdown(f"Showing {len(medicines)} of {total_items} total medicines")
     
     # Display medicines in cards
     cols = st.columns(2)
@@ -481,13 +1242,54 @@ def show_medicines():
                         st.write(medicine['description'])
                 
                 st.divider()
+    
+    # Load the next keyset page on demand; only that page is fetched
+    if catalogue["next_cursor"]:
+        st.button("⬇️ Load more medicines", use_container_width=True,
+                  on_click=load_catalogue_page, args=(key, search, category))
+
+def load_catalogue_page(key: Tuple, search: Optional[str], category: Optional[str],
+                        restart: bool = False) -> Optional[Dict]:
+    """Append the next keyset page to the catalogue cached under `key`.
+    
+    Returns the catalogue, or None if the first page could not be loaded; a
+    failed fetch leaves the cache untouched so the next rerun retries.
+    """
+    cache = st.session_state.api_client.cache
+    catalogue = None if restart else cache.get(key)
+    cursor = catalogue["next_cursor"] if catalogue else ""
+    medicines_data = st.session_state.api_client.get_medicines(
+        limit=MEDICINE_PAGE_SIZE,
+        search=search,
+        category=category,
+        cursor=cursor,
+        include_total=not cursor  # Count once, on the first page
+    )
+    pagination = medicines_data.get("pagination")
+    if not pagination:
+        return catalogue  # get_medicines already reported the error
+    
+    updated = {
+        "medicines": (catalogue["medicines"] if catalogue else ()) + tuple(medicines_data.get("medicines", [])),
+        "next_cursor": pagination.get("nextCursor"),
+        "total": catalogue["total"] if catalogue else pagination.get("totalItems"),
+        "loaded_at": catalogue["loaded_at"] if catalogue else time.monotonic(),
+    }
+    if cache.put(key, updated):
+        return updated
+    
+    # Over the session budget: keep what was already loaded
+    if catalogue:
+        cache.put(key, catalogue)
+    st.warning("⚠️ The catalogue reached this session's memory budget. Narrow the search to see more.")
+    return catalogue
 
 def show_prescriptions():
     """Show prescription management page"""
     st.markdown("# 💊 Prescription Management")
     st.markdown("Create and manage patient prescriptions")
     
-    tab1, tab2 = st.tabs(["📝 Create Prescription", "📋 Prescription History"])
+    tab1, tab2, tab3 = st.tabs(["📝 Create Prescription", "📋 Prescription History", "🖨️ Batch Print"])
     
     with tab1:
         st.markdown("### Create New Prescription")
@@ -614,6 +1416,82 @@ def show_prescriptions():
                           - Frequency: {med.get('frequency', 'Not specified')}
                           - Duration: {med.get('duration', 'Not specified')}
                         """)
+    
+    with tab3:
+        show_batch_print()
+
+def show_batch_print():
+    """Generate printable prescriptions for a date range in the background"""
+    st.markdown("### Batch Print Prescriptions")
+    st.markdown("Render printable prescriptions for every completed appointment in a date range")
+    
+    job = st.session_state.get("batch_job")
+    running = job is not None and not job.done
+    
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        start_date = st.date_input("From", value=datetime.now() - timedelta(days=30), key="batch_from")
+    with col2:
+        end_date = st.date_input("To", value=datetime.now(), key="batch_to")
+    with col3:
+        st.write("")  # Spacing
+        generate = st.button("🖨️ Generate", type="primary", disabled=running, use_container_width=True)
+    
+    if generate:
+        with st.spinner("Loading completed appointments..."):
+            appointments = st.session_state.api_client.get_completed_appointments_between(
+                st.session_state.doctor_data["name"],
+                f"{start_date}T00:00:00.000Z", f"{end_date}T23:59:59.999Z"
+            )
+        if appointments is None:
+            return
+        selected = [apt for apt in appointments if (apt.get('prescription') or {}).get('medicines')]
+        if not selected:
+            st.info("📭 No prescriptions found in this date range")
+            return
+        
+        file_name = f"prescriptions_{start_date}_{end_date}.zip"
+        pool = get_render_pool()
+        try:
+            job = PrescriptionBatchJob(selected, pool, file_name)
+        except BrokenProcessPool:
+            reset_render_pool(pool)
+            try:
+                job = PrescriptionBatchJob(selected, get_render_pool(), file_name)
+            except BrokenProcessPool as e:
+                st.error(f"Error starting prescription rendering: {e}")
+                return
+        st.session_state.batch_job = job
+        running = True
+    
+    if job is None:
+        return
+    if running:
+        show_batch_progress()
+    elif job.error is not None:
+        if isinstance(job.error, BrokenProcessPool):
+            reset_render_pool(job.pool)  # The next batch gets fresh workers
+        st.error(f"Error rendering prescriptions: {job.error}")
+    else:
+        st.success(f"✅ Rendered {job.total} prescriptions")
+        st.download_button(
+            "📥 Download prescriptions (.zip)",
+            job.zip_bytes(),
+            file_name=job.file_name,
+            mime="application/zip",
+        )
+
+@st.fragment(run_every=1)
+def show_batch_progress():
+    """Poll the running batch without rerunning the rest of the page"""
+    job = st.session_state.batch_job
+    st.progress(job.rendered / job.total, text=f"Rendered {job.rendered} of {job.total} prescriptions...")
+    if st.button("⏹️ Cancel", key="batch_cancel"):
+        job.cancel()
+        st.session_state.batch_job = None
+        st.rerun()
+    if job.done:
+        st.rerun()
 
 def show_dashboard():
     """Show main dashboard with analytics"""
@@ -733,12 +1611,75 @@ def show_dashboard():
             st.error("❌ Backend connection issue")
             st.json(health_status)
 
+def show_stale_notice(placeholder):
+    """Flag pages rendered from the disk snapshot instead of live data"""
+    stale_since = st.session_state.api_client.stale_since
+    if stale_since:
+        saved_at = datetime.fromtimestamp(min(stale_since.values()))
+        placeholder.warning(
+            f"🕒 Showing saved data from {saved_at:%Y-%m-%d %H:%M}. "
+            "Fresh data is loaded in the background once the backend responds."
+        )
+
+def show_profile_report(profiler: RerunProfiler, path: str):
+    """Show where the last profiled rerun spent its time"""
+    with st.sidebar.expander("⏱️ Last Rerun Profile", expanded=True):
+        st.markdown(f"**Total:** {profiler.elapsed * 1000:.0f} ms")
+        for category, seconds in profiler.breakdown.items():
+            st.markdown(f"- **{category.title()}:** {seconds * 1000:.0f} ms")
+        with open(path, "rb") as f:
+            st.download_button("📥 Download flamegraph", f.read(), file_name=os.path.basename(path),
+                               mime="application/json", use_container_width=True)
+        st.caption(f"Open in https://www.speedscope.app — saved to {path}")
+
+# Requests each page makes on first render, with the same arguments so
+# prefetched results land under the same cache keys
+PAGE_PREFETCHES: Dict[str, List[Callable[[APIClient], Any]]] = {
+    "Dashboard": [
+        lambda client: client.get_appointments(),
+        lambda client: client.get_medicines(limit=10),
+    ],
+    "Appointments": [
+        lambda client: client.get_appointments(status=None),
+    ],
+    "Medicines": [
+        lambda client: client.get_medicine_categories(),
+        lambda client: client.get_medicines(limit=MEDICINE_PAGE_SIZE, search=None, category=None,
+                                            cursor="", include_total=True),
+    ],
+    "Prescriptions": [
+        lambda client: client.get_appointments(status="completed"),
+    ],
+}
+
 def main():
     """Main application function"""
     
     # Initialize session state
     init_session_state()
     
+    if not profiling_requested():
+        run_app()
+        return
+    
+    profiler = RerunProfiler(st.session_state.get("current_page", "login"))
+    try:
+        with profiler:
+            run_app()
+    finally:
+        # Also keep profiles of reruns cut short by st.stop() or st.rerun()
+        path = profiler.save()
+    show_profile_report(profiler, path)
+
+def run_app():
+    """Render the login page or the selected page for one rerun"""
+    
+    # The doctor acted, so stop warming pages for the previous rerun
+    st.session_state.prefetcher.cancel()
+    
+    # Stale markers are collected afresh on every rerun
+    st.session_state.api_client.stale_since.clear()
+    
     # Check login state
     if not st.session_state.logged_in:
         show_login()
@@ -760,11 +1701,26 @@ def main():
         "Navigate to:",
         list(pages.keys()),
         index=0,
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key="current_page"
     )
+    stale_notice = st.empty()
+    
+    # Learn where this doctor goes next
+    doctor_id = st.session_state.doctor_data["id"]
+    previous_page = st.session_state.get("last_page")
+    if previous_page and previous_page != selected_page:
+        get_navigation_stats().record(doctor_id, previous_page, selected_page)
+    st.session_state.last_page = selected_page
     
     # Show selected page
     pages[selected_page]()
+    show_stale_notice(stale_notice)
+    
+    # Use the idle time until the next interaction to warm likely next pages
+    st.session_state.prefetcher.start(
+        get_navigation_stats().likely_next(doctor_id, selected_page, list(pages))
+    )
 
 if __name__ == "__main__":
     print("🏥 Starting Mediculture Doctor Application (Connected to Backend)")
@@ -0,0 +1,81 @@
+"""
+Mediculture Doctor Application - Printable Prescriptions
+Renders prescriptions to standalone HTML pages. Runs inside worker
+processes, so it only depends on the standard library.
+"""
+
+import html
+import re
+from typing import Dict, List, Tuple
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Prescription - {patient}</title>
+<style>
+  @page {{ size: A5; margin: 12mm; }}
+  body {{ font-family: Helvetica, Arial, sans-serif; color: #222; max-width: 148mm; margin: auto; }}
+  header {{ border-bottom: 2px solid #2e7d32; margin-bottom: 12px; }}
+  h1 {{ font-size: 18px; margin: 0; }}
+  table {{ width: 100%; border-collapse: collapse; margin: 12px 0; }}
+  th, td {{ border: 1px solid #999; padding: 4px 6px; text-align: left; font-size: 13px; }}
+  .meta {{ font-size: 13px; line-height: 1.5; }}
+  .signature {{ margin-top: 40px; border-top: 1px solid #222; width: 50%; font-size: 12px; }}
+</style>
+</head>
+<body>
+<header>
+  <h1>🏥 Mediculture - Prescription</h1>
+  <p class="meta">{doctor} &middot; {specialty}</p>
+</header>
+<p class="meta">
+  <strong>Patient ID:</strong> {patient}<br>
+  <strong>Date:</strong> {date}<br>
+  <strong>Type:</strong> {type}<br>
+  <strong>Symptoms:</strong> {symptoms}
+</p>
+<table>
+  <tr><th>Medicine</th><th>Dosage</th><th>Frequency</th><th>Duration</th></tr>
+{rows}
+</table>
+<p class="meta"><strong>Instructions:</strong> {instructions}</p>
+<p class="signature">{doctor}</p>
+</body>
+</html>
+"""
+
+ROW_TEMPLATE = "  <tr><td>{name}</td><td>{dosage}</td><td>{frequency}</td><td>{duration}</td></tr>"
+
+def render_prescription(appointment: Dict) -> Tuple[str, str]:
+    """Render one completed appointment as (file name, HTML page)"""
+    prescription = appointment.get('prescription') or {}
+    date = (appointment.get('appointmentDate') or '')[:10] or 'Unknown'
+    patient = appointment.get('userId') or 'Unknown'
+
+    rows = "\n".join(
+        ROW_TEMPLATE.format(
+            name=html.escape(med.get('medicineName') or 'Unknown'),
+            dosage=html.escape(med.get('dosage') or 'Not specified'),
+            frequency=html.escape(med.get('frequency') or 'Not specified'),
+            duration=html.escape(med.get('duration') or 'Not specified'),
+        )
+        for med in prescription.get('medicines', [])
+    )
+    page = PAGE_TEMPLATE.format(
+        patient=html.escape(patient),
+        doctor=html.escape(appointment.get('doctorName') or 'Unknown'),
+        specialty=html.escape(appointment.get('specialty') or ''),
+        date=html.escape(date),
+        type=html.escape((appointment.get('type') or 'consultation').title()),
+        symptoms=html.escape(', '.join(appointment.get('symptoms') or []) or 'None recorded'),
+        rows=rows,
+        instructions=html.escape(prescription.get('instructions') or appointment.get('notes') or 'None'),
+    )
+
+    file_name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{date}_{patient}_{appointment.get('_id', '')}") + ".html"
+    return file_name, page
+
+def render_batch(appointments: List[Dict]) -> List[Tuple[str, str]]:
+    """Render a chunk of appointments; the unit of work sent to the process pool"""
+    return [render_prescription(appointment) for appointment in appointments]
@@ -65,4 +65,7 @@ const appointmentSchema = new mongoose.Schema({
   timestamps: true
 });
 
+// Index for a doctor's appointments by status and date range
+appointmentSchema.index({ doctorName: 1, status: 1, appointmentDate: -1 });
+
 module.exports = mongoose.model('Appointment', appointmentSchema);
@@ -60,4 +60,8 @@ const medicineSchema = new mongoose.Schema({
 // Index for better search performance
 medicineSchema.index({ name: 'text', genericName: 'text', category: 'text' });
 
+// Indexes for keyset pagination of the catalogue (sorted by name, _id)
+medicineSchema.index({ isActive: 1, name: 1, _id: 1 });
+medicineSchema.index({ isActive: 1, category: 1, name: 1, _id: 1 });
+
 module.exports = mongoose.model('Medicine', medicineSchema);
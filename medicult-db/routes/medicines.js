@@ -3,7 +3,19 @@ const router = express.Router();
 const Medicine = require('../models/Medicine');
 const authenticateToken = require('../middleware/auth');
 
+// Keyset cursors carry the sort value and _id of the last item on a page
+const encodeCursor = (doc, sortBy) =>
+  Buffer.from(JSON.stringify([doc.get(sortBy), doc._id])).toString('base64url');
+
+const decodeCursor = (cursor) =>
+  JSON.parse(Buffer.from(cursor, 'base64url').toString());
+
+// Keyset seeks need a sort key that is never null or missing
+const KEYSET_SORT_FIELDS = ['name', 'price', 'createdAt'];
+
 // Get all medicines with pagination and filtering
+// Pass `cursor` (empty for the first page) for keyset pagination, and
+// `includeTotal=false` to skip counting the matching documents
 router.get('/', async (req, res) => {
   try {
     const { 
@@ -12,7 +24,9 @@ router.get('/', async (req, res) => {
       category, 
       search, 
       sortBy = 'name',
-      sortOrder = 'asc' 
+      sortOrder = 'asc',
+      cursor,
+      includeTotal = 'true'
     } = req.query;
 
     let query = { isActive: true };
@@ -28,16 +42,67 @@ router.get('/', async (req, res) => {
       ];
     }
 
+    // _id breaks ties so keyset pages are stable
+    const direction = sortOrder === 'desc' ? -1 : 1;
+    const sort = { [sortBy]: direction, _id: direction };
+
+    const total = includeTotal === 'false' ? undefined : await Medicine.countDocuments(query);
+
+    if (cursor !== undefined && !KEYSET_SORT_FIELDS.includes(sortBy)) {
+      return res.status(400).json({ error: `Cursor pagination supports sortBy ${KEYSET_SORT_FIELDS.join(', ')}` });
+    }
+
+    if (cursor !== undefined) {
+      // Seek past the last item instead of skipping, so deep pages stay cheap
+      if (cursor) {
+        let lastValue, lastId;
+        try {
+          [lastValue, lastId] = decodeCursor(cursor);
+        } catch (error) {
+          return res.status(400).json({ error: 'Invalid cursor' });
+        }
+        const op = direction === 1 ? '$gt' : '$lt';
+        query = {
+          $and: [
+            query,
+            {
+              $or: [
+                { [sortBy]: { [op]: lastValue } },
+                { [sortBy]: lastValue, _id: { [op]: lastId } }
+              ]
+            }
+          ]
+        };
+      }
+
+      const medicines = await Medicine.find(query)
+        .sort(sort)
+        .limit(limit * 1 + 1);
+
+      const hasMore = medicines.length > limit * 1;
+      if (hasMore) {
+        medicines.pop();
+      }
+
+      return res.json({
+        medicines,
+        pagination: {
+          nextCursor: hasMore ? encodeCursor(medicines[medicines.length - 1], sortBy) : null,
+          hasMore,
+          totalItems: total,
+          itemsPerPage: limit * 1
+        }
+      });
+    }
+
     const medicines = await Medicine.find(query)
-      .sort({ [sortBy]: sortOrder === 'desc' ? -1 : 1 })
+      .sort(sort)
       .limit(limit * 1)
       .skip((page - 1) * limit);
 
-    const total = await Medicine.countDocuments(query);
-
     res.json({
       medicines,
-      totalPages: Math.ceil(total / limit),
+      totalPages: total === undefined ? undefined : Math.ceil(total / limit),
       currentPage: page,
       total
     });
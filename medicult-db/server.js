@@ -104,7 +104,19 @@ app.patch('/api/users/health-stats', async (req, res) => {
 
 // ==================== MEDICINE ROUTES ====================
 
+// Keyset cursors carry the sort value and _id of the last item on a page
+const encodeCursor = (doc, sortBy) =>
+  Buffer.from(JSON.stringify([doc.get(sortBy), doc._id])).toString('base64url');
+
+const decodeCursor = (cursor) =>
+  JSON.parse(Buffer.from(cursor, 'base64url').toString());
+
+// Keyset seeks need a sort key that is never null or missing
+const KEYSET_SORT_FIELDS = ['name', 'price', 'createdAt'];
+
 // Get medicines with filtering and pagination
+// Pass `cursor` (empty for the first page) for keyset pagination, and
+// `includeTotal=false` to skip counting the matching documents
 app.get('/api/medicines', async (req, res) => {
   try {
     const { 
@@ -114,7 +126,9 @@ app.get('/api/medicines', async (req, res) => {
       search, 
       sortBy = 'name',
       sortOrder = 'asc',
-      prescriptionRequired
+      prescriptionRequired,
+      cursor,
+      includeTotal = 'true'
     } = req.query;
 
     let query = { isActive: true };
@@ -138,22 +152,73 @@ app.get('/api/medicines', async (req, res) => {
       query.prescriptionRequired = prescriptionRequired === 'true';
     }
 
-    // Sort configuration
+    // Sort configuration, with _id as a tiebreaker so keyset pages are stable
+    const direction = sortOrder === 'desc' ? -1 : 1;
     const sortConfig = {};
-    sortConfig[sortBy] = sortOrder === 'desc' ? -1 : 1;
+    sortConfig[sortBy] = direction;
+    sortConfig._id = direction;
+
+    const total = includeTotal === 'false' ? undefined : await Medicine.countDocuments(query);
+
+    if (cursor !== undefined && !KEYSET_SORT_FIELDS.includes(sortBy)) {
+      return res.status(400).json({ error: `Cursor pagination supports sortBy ${KEYSET_SORT_FIELDS.join(', ')}` });
+    }
+
+    if (cursor !== undefined) {
+      // Keyset pagination: seek past the last item instead of skipping,
+      // so every page costs the same regardless of depth
+      if (cursor) {
+        let lastValue, lastId;
+        try {
+          [lastValue, lastId] = decodeCursor(cursor);
+        } catch (error) {
+          return res.status(400).json({ error: 'Invalid cursor' });
+        }
+        const op = direction === 1 ? '$gt' : '$lt';
+        query = {
+          $and: [
+            query,
+            {
+              $or: [
+                { [sortBy]: { [op]: lastValue } },
+                { [sortBy]: lastValue, _id: { [op]: lastId } }
+              ]
+            }
+          ]
+        };
+      }
+
+      // Fetch one extra document to know whether another page exists
+      const medicines = await Medicine.find(query)
+        .sort(sortConfig)
+        .limit(parseInt(limit) + 1);
+
+      const hasMore = medicines.length > parseInt(limit);
+      if (hasMore) {
+        medicines.pop();
+      }
+
+      return res.json({
+        medicines,
+        pagination: {
+          nextCursor: hasMore ? encodeCursor(medicines[medicines.length - 1], sortBy) : null,
+          hasMore,
+          totalItems: total,
+          itemsPerPage: parseInt(limit)
+        }
+      });
+    }
 
     const medicines = await Medicine.find(query)
       .sort(sortConfig)
       .limit(parseInt(limit))
       .skip((parseInt(page) - 1) * parseInt(limit));
 
-    const total = await Medicine.countDocuments(query);
-
     res.json({
       medicines,
       pagination: {
         currentPage: parseInt(page),
-        totalPages: Math.ceil(total / parseInt(limit)),
+        totalPages: total === undefined ? undefined : Math.ceil(total / parseInt(limit)),
         totalItems: total,
         itemsPerPage: parseInt(limit)
       }
@@ -193,21 +258,41 @@ app.get('/api/medicines/categories/list', async (req, res) => {
 
 // ==================== APPOINTMENT ROUTES ====================
 
-// Get user appointments
+// Get appointments of a patient (`firebaseUid`) or a doctor (`doctorName`),
+// optionally within an appointmentDate range (`from`, `to`)
 app.get('/api/appointments', async (req, res) => {
   try {
-    const { firebaseUid, status, limit = 10 } = req.query;
+    const { firebaseUid, doctorName, status, from, to, limit = 10 } = req.query;
     
-    if (!firebaseUid) {
-      return res.status(400).json({ error: 'Firebase UID is required' });
+    if (!firebaseUid && !doctorName) {
+      return res.status(400).json({ error: 'Firebase UID or doctor name is required' });
     }
 
-    let query = { userId: firebaseUid };
+    let query = {};
+
+    if (firebaseUid) {
+      query.userId = firebaseUid;
+    }
+
+    if (doctorName) {
+      query.doctorName = doctorName;
+    }
     
     if (status) {
       query.status = status;
     }
 
+    // Appointment date range, both ends inclusive
+    if (from || to) {
+      query.appointmentDate = {};
+      if (from) {
+        query.appointmentDate.$gte = new Date(from);
+      }
+      if (to) {
+        query.appointmentDate.$lte = new Date(to);
+      }
+    }
+
     const appointments = await Appointment.find(query)
       .populate('prescription.medicines.medicineId', 'name genericName')
       .sort({ appointmentDate: -1 })